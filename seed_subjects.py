@@ -6,20 +6,22 @@ def seed_data():
     try:
         session.query(Subject).delete()
 
+        rows = []
+
         def add_subjects(names, band, category, ww, pt, qa, gmin=None, gmax=None):
-            for n in names:
-                session.add(
-                    Subject(
-                        name=n,
-                        category=category,
-                        level_band=band,
-                        grade_min=gmin,
-                        grade_max=gmax,
-                        weight_ww=ww,
-                        weight_pt=pt,
-                        weight_qa=qa,
-                    )
-                )
+            rows.extend(
+                {
+                    "name": n,
+                    "category": category,
+                    "level_band": band,
+                    "grade_min": gmin,
+                    "grade_max": gmax,
+                    "weight_ww": ww,
+                    "weight_pt": pt,
+                    "weight_qa": qa,
+                }
+                for n in names
+            )
 
         # Group A: JHS Languages, AP, EsP
         add_subjects(
@@ -96,6 +98,8 @@ def seed_data():
             12,
         )
 
+        # One executemany INSERT instead of an ORM add per subject.
+        session.execute(Subject.__table__.insert(), rows)
         session.commit()
         print("Subjects seeded successfully.")
     except Exception as exc:
@@ -111,4 +115,3 @@ if __name__ == "__main__":
         Base.metadata.create_all(bind=engine)
         seed_data()
         print("Database refreshed and seeded!")
-